@@ -1,8 +1,9 @@
 import logging
 import os
+import shutil
 import tempfile
 from pathlib import Path
-import subprocess
+from .envs import IS_CLOUD, CACHE_TTL, WRITE_PROBE
 
 # Logging Configuration
 logging.basicConfig(
@@ -11,32 +12,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger("berlin_mcp")
 
-def _get_base_dir() -> Path:
+def _get_base_dir(is_cloud: bool) -> Path:
     """Determine the base directory for data and filled forms."""
-    is_cloud = bool(os.environ.get("PORT"))
-    
-    local_dir = Path.cwd()
-    try:
-        # Test write access
-        test_file = local_dir / ".write_test"
-        if not is_cloud:
-            with open(test_file, "w") as f:
-                f.write("test")
-            test_file.unlink()
-            return local_dir
-    except (IOError, OSError):
-        pass
+    if not is_cloud:
+        local_dir = Path.cwd()
+        if os.access(local_dir, os.W_OK):
+            if not WRITE_PROBE:
+                return local_dir
+            try:
+                # Test write access
+                test_file = local_dir / ".write_test"
+                with open(test_file, "w") as f:
+                    f.write("test")
+                test_file.unlink()
+                return local_dir
+            except (IOError, OSError):
+                pass
     
     # Fallback to system temp directory
     temp_base = Path(tempfile.gettempdir()) / "berlin_mcp"
     temp_base.mkdir(parents=True, exist_ok=True)
     return temp_base
 
-BASE_DATA_DIR = _get_base_dir()
-IS_CLOUD = bool(os.environ.get("PORT"))
+BASE_DATA_DIR = _get_base_dir(IS_CLOUD)
 
 # Improved Remote/Cloud Detection
-HAS_OPEN_CMD = subprocess.run(["which", "open"], capture_output=True).returncode == 0
+HAS_OPEN_CMD = False if IS_CLOUD else shutil.which("open") is not None
 IS_TEMP_DIR = str(BASE_DATA_DIR).startswith(tempfile.gettempdir())
 IS_REMOTE = IS_CLOUD or (not HAS_OPEN_CMD and IS_TEMP_DIR)
 
@@ -46,7 +47,7 @@ logger.info(f"Using base storage directory: {BASE_DATA_DIR} (Cloud: {IS_CLOUD},
 CACHE_DIR = BASE_DATA_DIR / ".cache"
 FORMS_CACHE_DIR = CACHE_DIR / "forms"
 FILLED_FORMS_DIR = BASE_DATA_DIR / "filled_forms"
-DEDUPE_FILE = BASE_DATA_DIR / "recent_fills_v2.json"
+DEDUPE_FILE = BASE_DATA_DIR / "recent_fills_v3.jsonl"
 CACHE_FILE = CACHE_DIR / "berlin_services.json"
 
 # Ensure directories exist
@@ -56,7 +57,7 @@ FILLED_FORMS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Constants
 BASE_URL = "https://service.berlin.de/export/dienstleistungen/json/"
-CACHE_DURATION_SECONDS = 3600
+CACHE_DURATION_SECONDS = CACHE_TTL
 
 # Performance Profiles
 CONFIG = {
@@ -0,0 +1,16 @@
+"""Environment variables read by the server, resolved once at import."""
+import os
+from typing import Optional
+
+# Port for the streamable HTTP transport; its presence means a cloud deployment
+PORT: Optional[str] = os.environ.get("PORT")
+IS_CLOUD: bool = bool(PORT)
+
+# Base URL advertised for remote file sync
+SYNC_URL: str = os.environ.get("SYNC_URL", "https://berlin-services.fastmcp.app/mcp")
+
+# Lifetime of the services cache in seconds
+CACHE_TTL: int = int(os.environ.get("CACHE_TTL", "3600"))
+
+# Confirm write access with a real file write (for NFS/overlay mounts where os.access is unreliable)
+WRITE_PROBE: bool = os.environ.get("BERLIN_MCP_WRITE_PROBE", "").lower() in ("1", "true", "yes")
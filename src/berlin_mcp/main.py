@@ -1,5 +1,5 @@
-import os
 from .server import mcp
+from . import envs
 from .config import logger, CACHE_DURATION_SECONDS, CACHE_FILE
 # Import tools and resources to register them
 from . import tools
@@ -10,10 +10,9 @@ def main():
     logger.info(f"Cache TTL: {CACHE_DURATION_SECONDS}s")
     logger.info(f"Cache file: {CACHE_FILE}")
     
-    port = os.environ.get("PORT")
-    if port:
-        logger.info(f"Cloud mode: Starting on port {port}")
-        mcp.run(transport="streamable-http", port=int(port), host="0.0.0.0")
+    if envs.IS_CLOUD:
+        logger.info(f"Cloud mode: Starting on port {envs.PORT}")
+        mcp.run(transport="streamable-http", port=int(envs.PORT), host="0.0.0.0")
     else:
         logger.info("Local mode: Using stdio")
         mcp.run()
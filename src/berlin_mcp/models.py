@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Dict, FrozenSet
 
 class ServiceCategory(Enum):
     """Service categories for faceted search"""
@@ -23,14 +24,24 @@ class FormType(Enum):
     SUPPORTING_DOC = "Supporting Document"
     UNKNOWN = "Other Form"
 
-CATEGORY_KEYWORDS = {
-    ServiceCategory.HOUSING: ["anmeldung", "ummeldung", "abmeldung", "wohnung", "wohngeld"],
-    ServiceCategory.IDENTITY: ["reisepass", "passport", "ausweis", "id card"],
-    ServiceCategory.VEHICLES: ["führerschein", "fahrzeug", "kfz", "driving"],
-    ServiceCategory.BUSINESS: ["gewerbe", "business", "trade"],
-    ServiceCategory.FAMILY: ["geburt", "heirat", "ehe", "marriage", "family"],
-    ServiceCategory.IMMIGRATION: ["visum", "visa", "aufenthalt", "immigration"],
-    ServiceCategory.SOCIAL: ["sozial", "unemployment", "benefit"],
-    ServiceCategory.EDUCATION: ["schule", "universität", "education"],
-    ServiceCategory.HEALTH: ["gesund", "health", "insurance"],
+CATEGORY_KEYWORDS: Dict[ServiceCategory, FrozenSet[str]] = {
+    ServiceCategory.HOUSING: frozenset({"anmeldung", "ummeldung", "abmeldung", "wohnung", "wohngeld"}),
+    ServiceCategory.IDENTITY: frozenset({"reisepass", "passport", "ausweis", "id card"}),
+    ServiceCategory.VEHICLES: frozenset({"führerschein", "fahrzeug", "kfz", "driving"}),
+    ServiceCategory.BUSINESS: frozenset({"gewerbe", "business", "trade"}),
+    ServiceCategory.FAMILY: frozenset({"geburt", "heirat", "ehe", "marriage", "family"}),
+    ServiceCategory.IMMIGRATION: frozenset({"visum", "visa", "aufenthalt", "immigration"}),
+    ServiceCategory.SOCIAL: frozenset({"sozial", "unemployment", "benefit"}),
+    ServiceCategory.EDUCATION: frozenset({"schule", "universität", "education"}),
+    ServiceCategory.HEALTH: frozenset({"gesund", "health", "insurance"}),
+}
+
+# Checked in order: the first type with a keyword in the form name wins
+FORM_TYPE_KEYWORDS: Dict[FormType, FrozenSet[str]] = {
+    FormType.APPLICATION: frozenset({"antrag", "application"}),
+    FormType.CERTIFICATE: frozenset({"bescheinigung", "nachweis", "certificate"}),
+    FormType.INFORMATION: frozenset({"hinweis", "merkblatt", "information", "info"}),
+    FormType.INCOME_PROOF: frozenset({"verdienst", "einkommen", "income"}),
+    FormType.CHECKLIST: frozenset({"checkliste", "checklist", "liste"}),
+    FormType.SUPPORTING_DOC: frozenset({"extrablatt", "anlage", "supplement"}),
 }
@@ -1,3 +1,12 @@
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP
+from .services.api_client import close_http_client
 
-mcp = FastMCP("Berlin Services - Enhanced with Forms + Remote Sync")
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    try:
+        yield
+    finally:
+        await close_http_client()
+
+mcp = FastMCP("Berlin Services - Enhanced with Forms + Remote Sync", lifespan=lifespan)
@@ -1,10 +1,31 @@
-import httpx
+import orjson
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 from ..config import BASE_URL, CACHE_DURATION_SECONDS, CACHE_FILE, logger
 from .cache import CacheManager
+from .catalog import ServiceCatalog
+
+if TYPE_CHECKING:
+    import httpx
 
 _cache = CacheManager(CACHE_FILE, CACHE_DURATION_SECONDS)
+_catalog = ServiceCatalog()
+_http_client: Optional["httpx.AsyncClient"] = None
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Shared keep-alive client so repeated requests to service.berlin.de reuse connections."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        import httpx  # Deferred so cache-served requests never load the HTTP stack
+        _http_client = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
+    return _http_client
+
+async def close_http_client():
+    """Close the shared client, if one was opened."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 FALLBACK_DATA = {
     "data": [
@@ -46,6 +67,15 @@ FALLBACK_DATA = {
     "hash": "fallback_v1"
 }
 
+def _index(data: Dict) -> bool:
+    """Make sure the catalog indexes match `data`; False if the payload can't be indexed."""
+    try:
+        _catalog.load(data)
+        return True
+    except Exception as e:
+        logger.error(f"Catalog indexing failed: {e}")
+        return False
+
 async def fetch_services_data(force_refresh: bool = False) -> Tuple[Dict, str]:
     """
     Fetch services with intelligent fallback strategy.
@@ -55,35 +85,52 @@ async def fetch_services_data(force_refresh: bool = False) -> Tuple[Dict, str]:
     """
     
     # Try memory cache
-    if not force_refresh:
+    if force_refresh:
+        _cache.invalidate()
+    else:
         data, valid = _cache.get_memory()
-        if valid:
+        if valid and _index(data):
             return data, "memory"
     
     # Try live API
+    live, raw = None, b""
     try:
         logger.info("Fetching from live API")
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(BASE_URL)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("data") and isinstance(data["data"], list):
-                _cache.set(data)
-                logger.info(f"Live API: {len(data['data'])} services fetched")
-                return data, "live"
+        response = await get_http_client().get(BASE_URL)
+        response.raise_for_status()
+        raw = response.content
+        data = orjson.loads(raw)
+        
+        if data.get("data") and isinstance(data["data"], list):
+            live = data
     except Exception as e:
         logger.warning(f"Live API failed: {e}")
     
+    # Only a payload that indexes cleanly is cached
+    if live is not None:
+        if _index(live):
+            _cache.set(live, raw)
+            logger.info(f"Live API: {len(live['data'])} services fetched")
+            return live, "live"
+        logger.warning("Live payload could not be indexed; not caching it")
+    
     # Try disk cache
     if not force_refresh:
         data, valid = _cache.get_disk()
-        if data:
+        if data and _index(data):
             return data, "disk"
     
     # Fallback to embedded data
     logger.warning("Using fallback data")
+    _index(FALLBACK_DATA)
     return FALLBACK_DATA, "fallback"
 
 def get_cache_instance() -> CacheManager:
     return _cache
+
+def get_catalog_instance() -> ServiceCatalog:
+    return _catalog
+
+def get_service_by_id(service_id: str) -> Optional[Dict]:
+    """Look up a service in the most recently fetched payload."""
+    return _catalog.get(service_id)
@@ -1,4 +1,6 @@
-import json
+import os
+import time
+import orjson
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional, Tuple
@@ -12,6 +14,13 @@ class CacheManager:
         self.ttl = ttl
         self._memory_cache: Optional[Dict] = None
         self._memory_timestamp: Optional[datetime] = None
+        # time.monotonic() deadline of the memory cache, so the hot path is a float compare
+        self._memory_expires: float = 0.0
+        # Bumped whenever the cached payload is replaced or expired
+        self.version = 0
+        # mtime and timestamp of the disk cache contents mirrored in _memory_cache
+        self._disk_mtime: float = 0.0
+        self._disk_timestamp: Optional[datetime] = None
     
     def is_valid(self, timestamp: Optional[datetime]) -> bool:
         """Check if cache timestamp is still valid"""
@@ -22,21 +31,34 @@ class CacheManager:
     
     def get_memory(self) -> Tuple[Optional[Dict], bool]:
         """Get data from memory cache"""
-        if self.is_valid(self._memory_timestamp):
+        if time.monotonic() < self._memory_expires:
             logger.debug("Memory cache hit")
             return self._memory_cache, True
         return None, False
     
     def get_disk(self) -> Tuple[Optional[Dict], bool]:
         """Get data from disk cache"""
-        if not self.cache_file.exists():
+        try:
+            mtime = self.cache_file.stat().st_mtime
+        except OSError:
+            return None, False
+        
+        # Unchanged since last read or write: skip the re-parse
+        if mtime == self._disk_mtime and self._memory_cache is not None:
+            if self.is_valid(self._disk_timestamp):
+                logger.debug("Disk cache hit (unchanged)")
+                return self._memory_cache, True
             return None, False
         
         try:
-            with open(self.cache_file, 'r') as f:
-                cached = json.load(f)
+            with open(self.cache_file, 'rb') as f:
+                cached = orjson.loads(f.read())
             
             timestamp = datetime.fromisoformat(cached.get('_timestamp', ''))
+            self._memory_cache = cached['data']
+            self.version += 1
+            self._disk_mtime = mtime
+            self._disk_timestamp = timestamp
             if self.is_valid(timestamp):
                 logger.debug("Disk cache hit")
                 return cached['data'], True
@@ -45,25 +67,52 @@ class CacheManager:
         
         return None, False
     
-    def set(self, data: Dict):
-        """Store in both memory and disk cache"""
+    def set(self, data: Dict, raw: Optional[bytes] = None):
+        """Store in both memory and disk cache; `raw` is the payload's original JSON, written as-is if given"""
         self._memory_cache = data
         self._memory_timestamp = datetime.now()
+        self._memory_expires = time.monotonic() + self.ttl
+        self.version += 1
         
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump({
-                    'data': data,
-                    '_timestamp': datetime.now().isoformat()
-                }, f)
+            # Write to a sibling file and rename so readers never see a partial cache
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'wb') as f:
+                if raw:
+                    f.write(b'{"_timestamp":' + orjson.dumps(self._memory_timestamp.isoformat()) + b',"data":' + raw + b'}')
+                else:
+                    f.write(orjson.dumps({
+                        'data': data,
+                        '_timestamp': self._memory_timestamp.isoformat()
+                    }))
+            os.replace(tmp_file, self.cache_file)
+            self._disk_mtime = self.cache_file.stat().st_mtime
+            self._disk_timestamp = self._memory_timestamp
             logger.debug("Data cached to disk and memory")
         except Exception as e:
             logger.warning(f"Disk cache write error: {e}")
     
+    def invalidate(self):
+        """Expire cached entries without deleting them; disk data stays usable as a fallback"""
+        self._memory_timestamp = None
+        self._memory_expires = 0.0
+        self._disk_mtime = 0.0
+        self.version += 1
+        logger.debug("Cache invalidated")
+    
+    @property
+    def last_modified(self) -> float:
+        """mtime of the disk cache last read or written by this instance (0.0 if none)"""
+        return self._disk_mtime
+    
     def clear(self):
         """Clear all caches"""
         self._memory_cache = None
         self._memory_timestamp = None
+        self._memory_expires = 0.0
+        self._disk_mtime = 0.0
+        self._disk_timestamp = None
+        self.version += 1
         if self.cache_file.exists():
             self.cache_file.unlink()
         logger.info("Cache cleared")
@@ -0,0 +1,252 @@
+import heapq
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Set, Tuple
+from ..config import logger
+from ..models import ServiceCategory, FormType
+from .service_logic import categorize_service, detect_form_type
+
+_WORD_RE = re.compile(r"\w+")
+
+def _derive_fields(s: Dict) -> List[Dict]:
+    """Store the derived "_" fields on a service and its forms; returns the forms"""
+    s["_name_lc"] = (s.get("name") or "").lower()
+    s["_desc_lc"] = (s.get("description") or "").lower()
+    s["_kw_lc"] = ((s.get("meta") or {}).get("keywords") or "").lower()
+    s["_full_lc"] = f"{s['_name_lc']} {s['_kw_lc']}"
+    # Searchable fields joined by newlines, which query terms never contain
+    s["_search_lc"] = f"{s['_name_lc']}\n{s['_desc_lc']}\n{s['_kw_lc']}"
+    s["_category"] = categorize_service(s)
+    s["_category_value"] = s["_category"].value
+    forms = s.get("forms") or []
+    for form in forms:
+        form["_name_lc"] = (form.get("name") or "").lower()
+        form["_type"] = detect_form_type(form["_name_lc"])
+        form["_type_value"] = form["_type"].value
+    s["_forms_count"] = len(forms)
+    return forms
+
+def _blank_fields(s: Dict):
+    """Neutral derived fields for a service whose data couldn't be indexed"""
+    s.update(_name_lc="", _desc_lc="", _kw_lc="", _full_lc="", _search_lc="\n\n",
+             _category=ServiceCategory.OTHER, _category_value=ServiceCategory.OTHER.value, _forms_count=0)
+    forms = s.get("forms")
+    for form in forms if isinstance(forms, list) else []:
+        if isinstance(form, dict):
+            form.update(_name_lc="", _type=FormType.UNKNOWN, _type_value=FormType.UNKNOWN.value)
+
+class _TokenIndex:
+    """Inverted index from word tokens to positions, answering exact substring lookups"""
+    
+    def __init__(self, token_postings: Optional[Dict[str, Set[int]]] = None):
+        token_postings = token_postings or {}
+        vocab = list(token_postings)
+        starts, offset = [], 0
+        for token in vocab:
+            starts.append(offset)
+            offset += len(token) + 1
+        # Vocabulary token -> positions of the entries containing it
+        self._postings: List[Set[int]] = [token_postings[t] for t in vocab]
+        # All tokens joined by newlines, with each token's start offset, for substring lookups
+        self._vocab_blob = "\n".join(vocab)
+        self._vocab_starts: List[int] = starts
+    
+    def positions(self, term: str) -> Optional[Set[int]]:
+        """Positions of entries with `term` as a substring of their text, or None if the index can't answer.
+        
+        A term made only of word characters can only occur inside a single token, so the entries
+        containing it are the union of the postings of every vocabulary token containing it.
+        """
+        if not _WORD_RE.fullmatch(term):
+            return None
+        blob, starts = self._vocab_blob, self._vocab_starts
+        positions: Set[int] = set()
+        i = blob.find(term)
+        while i != -1:
+            idx = bisect_right(starts, i) - 1
+            positions |= self._postings[idx]
+            next_token = idx + 1
+            i = blob.find(term, starts[next_token]) if next_token < len(starts) else -1
+        return positions
+
+class ServiceCatalog:
+    """Lookup indexes derived from a services payload, rebuilt whenever a new payload is served"""
+    
+    def __init__(self):
+        self._source: Optional[Dict] = None
+        self.services: List[Dict] = []
+        self.by_id: Dict[str, Dict] = {}
+        # Columns of the fields listings return, parallel to services
+        self.ids: List[Optional[str]] = []
+        self.names: List[Optional[str]] = []
+        self._tokens = _TokenIndex()
+        # Filter facets: service positions per category / online availability / forms
+        self._category_positions: Dict[ServiceCategory, Set[int]] = {}
+        self._online_positions: Set[int] = set()
+        self._forms_positions: Set[int] = set()
+        self._no_forms_positions: Set[int] = set()
+        # Every (service, form) pair in catalog order, with form positions per detected type
+        self.forms: List[Tuple[Dict, Dict]] = []
+        self._form_type_positions: Dict[FormType, List[int]] = {}
+        self._form_tokens = _TokenIndex()
+    
+    def load(self, data: Dict):
+        """Index `data` unless it is the payload already indexed"""
+        if data is self._source:
+            return
+        services = [s for s in data.get("data") or [] if isinstance(s, dict)]
+        by_id: Dict[str, Dict] = {}
+        ids: List[Optional[str]] = []
+        names: List[Optional[str]] = []
+        token_postings: Dict[str, Set[int]] = {}
+        category_positions: Dict[ServiceCategory, Set[int]] = {}
+        online_positions: Set[int] = set()
+        forms_positions: Set[int] = set()
+        no_forms_positions: Set[int] = set()
+        forms: List[Tuple[Dict, Dict]] = []
+        form_type_positions: Dict[FormType, List[int]] = {}
+        form_token_postings: Dict[str, Set[int]] = {}
+        # One pass builds every index; derived fields are stored on the service and form dicts under "_" keys
+        for pos, s in enumerate(services):
+            by_id[s.get("id")] = s
+            ids.append(s.get("id"))
+            names.append(s.get("name"))
+            try:
+                service_forms = _derive_fields(s)
+            except Exception as e:
+                # A malformed row stays listed by id but matches no search or form lookup
+                logger.warning(f"Could not index service {s.get('id')}: {e}")
+                _blank_fields(s)
+                service_forms = []
+            category_positions.setdefault(s["_category"], set()).add(pos)
+            if s.get("onlineservices") or s.get("onlineprocessing"):
+                online_positions.add(pos)
+            (forms_positions if s["_forms_count"] else no_forms_positions).add(pos)
+            for form in service_forms:
+                form_pos = len(forms)
+                forms.append((s, form))
+                form_type_positions.setdefault(form["_type"], []).append(form_pos)
+                for token in _WORD_RE.findall(form["_name_lc"]):
+                    form_token_postings.setdefault(token, set()).add(form_pos)
+            for token in _WORD_RE.findall(f"{s['_full_lc']} {s['_desc_lc']}"):
+                token_postings.setdefault(token, set()).add(pos)
+        
+        self.services = services
+        self.by_id = by_id
+        self.ids = ids
+        self.names = names
+        self._tokens = _TokenIndex(token_postings)
+        self._category_positions = category_positions
+        self._online_positions = online_positions
+        self._forms_positions = forms_positions
+        self._no_forms_positions = no_forms_positions
+        self.forms = forms
+        self._form_type_positions = form_type_positions
+        self._form_tokens = _TokenIndex(form_token_postings)
+        self._source = data
+    
+    def get(self, service_id: str) -> Optional[Dict]:
+        """Look up a service by id"""
+        return self.by_id.get(service_id)
+    
+    def filter_positions(
+        self,
+        category: Optional[ServiceCategory] = None,
+        online_only: bool = False,
+        has_forms: Optional[bool] = None
+    ) -> Optional[Set[int]]:
+        """Positions of services passing the given filters, or None when no filter is set"""
+        facets = []
+        if category is not None:
+            facets.append(self._category_positions.get(category, set()))
+        if online_only:
+            facets.append(self._online_positions)
+        if has_forms is not None:
+            facets.append(self._forms_positions if has_forms else self._no_forms_positions)
+        if not facets:
+            return None
+        return set.intersection(*facets)
+    
+    def page_positions(self, positions: Set[int], start: int, end: int) -> List[int]:
+        """The sorted positions [start:end], without ordering the whole set"""
+        return heapq.nsmallest(end, positions)[start:]
+    
+    def page_at(self, positions: Set[int], start: int, end: int) -> List[Dict]:
+        """Services at the sorted positions [start:end]"""
+        return [self.services[pos] for pos in self.page_positions(positions, start, end)]
+    
+    def listing(self, positions: List[int]) -> List[Dict]:
+        """{"id", "name"} entries for the given positions, read from the columns"""
+        ids, names = self.ids, self.names
+        return [{"id": ids[pos], "name": names[pos]} for pos in positions]
+    
+    def search_positions(self, terms: List[str], match_all: bool = True, within: Optional[Set[int]] = None) -> Set[int]:
+        """Positions of services whose name, description or keywords contain all (or any) of the terms.
+        
+        `within` restricts the search to a set of positions, e.g. from filter_positions().
+        """
+        term_sets = []
+        for term in terms:
+            positions = self._tokens.positions(term)
+            if positions is None:
+                return self._scan(terms, match_all, within)
+            term_sets.append(positions)
+        if not term_sets:
+            return set()
+        matched = set.intersection(*term_sets) if match_all else set.union(*term_sets)
+        if within is not None:
+            matched &= within
+        return matched
+    
+    def _scan(self, terms: List[str], match_all: bool, within: Optional[Set[int]] = None) -> Set[int]:
+        """Substring scan over the candidate services, for terms the index can't resolve.
+        
+        All terms are matched in one regex pass per service. The longest-first lookahead reports the
+        longest term starting at each position; shorter terms starting there are its prefixes.
+        """
+        services = self.services
+        candidates = range(len(services)) if within is None else within
+        unique = set(terms)
+        if not unique:
+            return set(candidates) if match_all else set()
+        pattern = re.compile(
+            "(?=(" + "|".join(map(re.escape, sorted(unique, key=len, reverse=True))) + "))"
+        )
+        if not match_all:
+            return {pos for pos in candidates if pattern.search(services[pos]["_search_lc"])}
+        
+        prefixes = {term: {other for other in unique if term.startswith(other)} for term in unique}
+        matched: Set[int] = set()
+        for pos in candidates:
+            hits: Set[str] = set()
+            for match in pattern.finditer(services[pos]["_search_lc"]):
+                hits |= prefixes[match.group(1)]
+                if len(hits) == len(unique):
+                    matched.add(pos)
+                    break
+        return matched
+    
+    def forms_of_type(self, form_type: FormType) -> List[Tuple[Dict, Dict]]:
+        """(service, form) pairs of one detected type, in catalog order"""
+        return [self.forms[pos] for pos in self._form_type_positions.get(form_type, [])]
+    
+    def search_forms(self, terms: List[str], form_type: Optional[FormType] = None) -> List[Tuple[Dict, Dict]]:
+        """(service, form) pairs whose form name contains all of the terms, in catalog order"""
+        matched: Optional[Set[int]] = None
+        if form_type is not None:
+            matched = set(self._form_type_positions.get(form_type, []))
+        for term in terms:
+            positions = self._form_tokens.positions(term)
+            if positions is None:
+                candidates = range(len(self.forms)) if matched is None else matched
+                positions = {pos for pos in candidates if term in self.forms[pos][1]["_name_lc"]}
+            matched = positions if matched is None else matched & positions
+            if not matched:
+                return []
+        if matched is None:
+            return list(self.forms)
+        return [self.forms[pos] for pos in sorted(matched)]
+    
+    def clear(self):
+        """Drop all indexes"""
+        self.__init__()
@@ -1,9 +1,9 @@
-import base64
-import os
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional
 from ..config import logger
+from ..envs import SYNC_URL
+from ..utils import encode_file_base64
 
 class RemoteFileSyncManager:
     """
@@ -14,7 +14,7 @@ class RemoteFileSyncManager:
         self.cache_dir = cache_dir or Path.cwd() / ".remote_cache"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         # Placeholder remote URL logic
-        self.remote_api_url = remote_api_url or os.environ.get("SYNC_URL", "https://berlin-services.fastmcp.app/mcp")
+        self.remote_api_url = remote_api_url or SYNC_URL
         self.manifest = {}  # Track what files are available
     
     def register_file(self, file_id: str, file_path: Path, file_size: int):
@@ -33,8 +33,7 @@ class RemoteFileSyncManager:
             path = Path(file_path)
             if not path.exists():
                 return None
-            with open(path, "rb") as f:
-                return base64.b64encode(f.read()).decode('utf-8')
+            return encode_file_base64(path)
         except Exception as e:
             logger.error(f"Error reading file for sync: {e}")
             return None
@@ -1,53 +1,132 @@
+import functools
 import hashlib
 import json
 import base64
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional, Any, List, Tuple
-import httpx
-import fitz  # PyMuPDF
 from ..config import logger, FORMS_CACHE_DIR, FILLED_FORMS_DIR, CONFIG, IS_REMOTE, IS_CLOUD, DEDUPE_FILE
-from ..models import FormType
+from ..utils import encode_file_base64
+from .api_client import get_http_client
+from .service_logic import detect_form_type
 from .loop_protector import LoopProtector
 from .file_sync import RemoteFileSyncManager
 
 _protector = LoopProtector(DEDUPE_FILE)
 _file_sync = RemoteFileSyncManager()
 
-def detect_form_type(form_name: str) -> FormType:
-    """Detect form type from name"""
-    name_lower = form_name.lower()
-    
-    if any(word in name_lower for word in ["antrag", "application"]):
-        return FormType.APPLICATION
-    elif any(word in name_lower for word in ["bescheinigung", "nachweis", "certificate"]):
-        return FormType.CERTIFICATE
-    elif any(word in name_lower for word in ["hinweis", "merkblatt", "information", "info"]):
-        return FormType.INFORMATION
-    elif any(word in name_lower for word in ["verdienst", "einkommen", "income"]):
-        return FormType.INCOME_PROOF
-    elif any(word in name_lower for word in ["checkliste", "checklist", "liste"]):
-        return FormType.CHECKLIST
-    elif any(word in name_lower for word in ["extrablatt", "anlage", "supplement"]):
-        return FormType.SUPPORTING_DOC
-    
-    return FormType.UNKNOWN
+@functools.lru_cache(maxsize=256)
+def _url_hash(url: str) -> str:
+    """Stable cache key for a form URL."""
+    return hashlib.md5(url.encode()).hexdigest()
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Lowercased field keys -> name/label fragments that identify the matching widget
+COMMON_MAPPINGS: Dict[str, Tuple[str, ...]] = {
+    "männlich": ("geschlecht",), "weiblich": ("geschlecht",), "divers": ("geschlecht",),
+    "ledig": ("familienstand",), "einzugsdatum": ("tag des einzugs",),
+    "postleitzahl": ("plz", "postleitzahl"), "straße": ("strasse", "straße"),
+}
+
+def _build_token_index(widget_index: List[Tuple[str, str]]) -> Dict[str, List[int]]:
+    """Map each word of a widget's name/label to the positions of the widgets containing it."""
+    token_index: Dict[str, List[int]] = {}
+    for pos, (name_low, label_low) in enumerate(widget_index):
+        for token in set(_TOKEN_RE.findall(f"{name_low} {label_low}")):
+            token_index.setdefault(token, []).append(pos)
+    return token_index
+
+def _find_fuzzy_widget(
+    k_low: str,
+    fragments: Tuple[str, ...],
+    widget_index: List[Tuple[str, str]],
+    token_index: Dict[str, List[int]]
+) -> Optional[int]:
+    """Find the widget for an unmatched key, preferring whole-word hits over substring scans."""
+    hits = [pos for token in (k_low, *fragments) for pos in token_index.get(token, ())]
+    if hits:
+        return min(hits)
+    for pos, (name_low, label_low) in enumerate(widget_index):
+        if any(term in name_low or term in label_low for term in (k_low, *fragments)):
+            return pos
+    return None
+
+# Both per-form caches below keep only the most recently used forms
+_PDF_CACHE_SIZE = 16
+# url_hash -> (pdf mtime, raw bytes) for recently opened source forms, in LRU order
+_pdf_bytes_cache: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+# url_hash -> (pdf mtime, lowered (name, label) per named widget, token index), in LRU order
+_pdf_parse_cache: "OrderedDict[str, Tuple[float, List[Tuple[str, str]], Dict[str, List[int]]]]" = OrderedDict()
+
+def _open_source_pdf(url_hash: str, path: Path):
+    """Open a cached source form from memory, reading it from disk only when new or changed."""
+    import fitz  # PyMuPDF
+    mtime = path.stat().st_mtime
+    cached = _pdf_bytes_cache.get(url_hash)
+    if cached and cached[0] == mtime:
+        _pdf_bytes_cache.move_to_end(url_hash)
+        data = cached[1]
+    else:
+        data = path.read_bytes()
+        _pdf_bytes_cache[url_hash] = (mtime, data)
+        if len(_pdf_bytes_cache) > _PDF_CACHE_SIZE:
+            _pdf_bytes_cache.popitem(last=False)
+    return fitz.open(stream=data, filetype="pdf")
+
+def _get_widget_index(
+    url_hash: str, input_path: Path, widgets: List[Any]
+) -> Tuple[List[Tuple[str, str]], Dict[str, List[int]]]:
+    """Lowered widget names/labels and their token index, reused while the cached PDF is unchanged."""
+    mtime = input_path.stat().st_mtime
+    cached = _pdf_parse_cache.get(url_hash)
+    if cached and cached[0] == mtime and len(cached[1]) == len(widgets):
+        _pdf_parse_cache.move_to_end(url_hash)
+        return cached[1], cached[2]
+    widget_index = [(w.field_name.lower(), (w.field_label or "").lower()) for w in widgets]
+    token_index = _build_token_index(widget_index)
+    _pdf_parse_cache[url_hash] = (mtime, widget_index, token_index)
+    _pdf_parse_cache.move_to_end(url_hash)
+    if len(_pdf_parse_cache) > _PDF_CACHE_SIZE:
+        _pdf_parse_cache.popitem(last=False)
+    return widget_index, token_index
+
+async def _download_pdf(form_url: str, target: Path, timeout: float):
+    """Stream a PDF to disk in chunks; the target only appears once the download completed."""
+    # A unique temp file per download, so concurrent fetches of one URL never share an inode
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=f"{target.stem}.", suffix=".part", delete=False) as f:
+        tmp_path = Path(f.name)
+    try:
+        async with get_http_client().stream("GET", form_url, timeout=timeout) as response:
+            response.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                async for chunk in response.aiter_bytes(65536):
+                    f.write(chunk)
+        os.replace(tmp_path, target)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+def _elapsed_ms(start_ns: int) -> float:
+    """Milliseconds since a time.perf_counter_ns() reading."""
+    return round((time.perf_counter_ns() - start_ns) / 1e6, 2)
 
 async def analyze_form_for_filling_logic(form_url: str) -> Dict[str, Any]:
     """Internal logic for PDF analysis."""
     try:
-        url_hash = hashlib.md5(form_url.encode()).hexdigest()
+        url_hash = _url_hash(form_url)
         local_path = FORMS_CACHE_DIR / f"{url_hash}.pdf"
         
         if not local_path.exists():
             logger.info(f"Downloading form for analysis: {form_url}")
-            async with httpx.AsyncClient(timeout=45.0, follow_redirects=True) as client:
-                response = await client.get(form_url)
-                response.raise_for_status()
-                with open(local_path, "wb") as f:
-                    f.write(response.content)
+            await _download_pdf(form_url, local_path, timeout=45.0)
         
-        doc = fitz.open(str(local_path))
+        doc = _open_source_pdf(url_hash, local_path)
         extracted_fields = []
         
         for page_num in range(doc.page_count):
@@ -120,24 +199,22 @@ async def perform_form_filling_logic(
         }
 
     telemetry = {}
-    total_start = datetime.now()
+    total_start = time.perf_counter_ns()
+    started_at = time.time_ns()
     
     if not field_data:
         return {"success": False, "error": "No field data provided."}
 
     try:
-        step_start = datetime.now()
-        url_hash = hashlib.md5(form_url.encode()).hexdigest()
+        import fitz  # PyMuPDF, not needed for deduplicated requests
+        step_start = time.perf_counter_ns()
+        url_hash = _url_hash(form_url)
         input_path = FORMS_CACHE_DIR / f"{url_hash}.pdf"
         
         if not input_path.exists():
             logger.info(f"Downloading PDF from {form_url}")
-            async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-                response = await client.get(form_url)
-                response.raise_for_status()
-                with open(input_path, "wb") as f:
-                    f.write(response.content)
-            telemetry["download_ms"] = round((datetime.now() - step_start).total_seconds() * 1000, 2)
+            await _download_pdf(form_url, input_path, timeout=15.0)
+            telemetry["download_ms"] = _elapsed_ms(step_start)
         else:
             telemetry["cache_hit"] = True
             telemetry["download_ms"] = 0
@@ -148,84 +225,75 @@ async def perform_form_filling_logic(
             output_filename += ".pdf"
         final_output_path = FILLED_FORMS_DIR / output_filename
         
-        step_start = datetime.now()
-        doc = fitz.open(str(input_path))
-        telemetry["open_ms"] = round((datetime.now() - step_start).total_seconds() * 1000, 2)
+        step_start = time.perf_counter_ns()
+        doc = _open_source_pdf(url_hash, input_path)
+        telemetry["open_ms"] = _elapsed_ms(step_start)
         
-        step_start = datetime.now()
-        widgets = []
-        widget_map = {}
-        for page in doc:
-            for widget in page.widgets():
-                if widget.field_name:
-                    widgets.append(widget)
-                    widget_map[widget.field_name] = widget
-        telemetry["index_ms"] = round((datetime.now() - step_start).total_seconds() * 1000, 2)
+        step_start = time.perf_counter_ns()
+        widgets = [w for page in doc for w in page.widgets() if w.field_name]
+        widget_map = {w.field_name: w for w in widgets}
+        widget_index, token_index = _get_widget_index(url_hash, input_path, widgets)
+        telemetry["index_ms"] = _elapsed_ms(step_start)
         
         filled_count = 0
         unmatched_keys = set(field_data.keys())
         matched_fields_info = {}
+        # Widgets whose value changed; each is committed with a single update() at the end
+        dirty_widgets: Dict[int, Any] = {}
         
-        step_start_phase = datetime.now()
+        step_start_phase = time.perf_counter_ns()
         for key in list(unmatched_keys):
             if key in widget_map:
                 w = widget_map[key]
                 val = str(field_data[key])
                 if w.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                    w.field_value = "Yes" if val.lower() in ['yes', 'true', '1', 'on', 'x'] else "Off"
-                else:
+                    val = "Yes" if val.lower() in ['yes', 'true', '1', 'on', 'x'] else "Off"
+                if w.field_value != val:
                     w.field_value = val
-                w.update()
+                    dirty_widgets[id(w)] = w
                 filled_count += 1
                 unmatched_keys.discard(key)
                 matched_fields_info[key] = w.field_name
         
         if unmatched_keys:
-            COMMON_MAPPINGS = {
-                "männlich": ["geschlecht"], "weiblich": ["geschlecht"], "divers": ["geschlecht"],
-                "ledig": ["familienstand"], "einzugsdatum": ["tag des einzugs"],
-                "postleitzahl": ["plz", "postleitzahl"], "straße": ["strasse", "straße"],
-            }
             for key in list(unmatched_keys):
                 k_low = key.lower()
-                found_match = False
-                for w in widgets:
-                    name_low = w.field_name.lower()
-                    label_low = (w.field_label or "").lower()
-                    if k_low in name_low or k_low in label_low:
-                        found_match = True
-                    elif k_low in COMMON_MAPPINGS:
-                        for frag in COMMON_MAPPINGS[k_low]:
-                            if frag in name_low or frag in label_low:
-                                found_match = True; break
-                    
-                    if found_match:
-                        val = str(field_data[key])
-                        if w.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                            is_checked = val.lower() in ['yes', 'true', 'x'] or val.lower() in name_low
-                            w.field_value = "Yes" if is_checked else "Off"
-                        else:
-                            w.field_value = val
-                        w.update()
-                        filled_count += 1
-                        unmatched_keys.discard(key)
-                        matched_fields_info[key] = w.field_name
-                        break
-        telemetry["match_fill_ms"] = round((datetime.now() - step_start_phase).total_seconds() * 1000, 2)
+                pos = _find_fuzzy_widget(k_low, COMMON_MAPPINGS.get(k_low, ()), widget_index, token_index)
+                if pos is None:
+                    continue
+                name_low = widget_index[pos][0]
+                w = widgets[pos]
+                val = str(field_data[key])
+                if w.field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+                    is_checked = val.lower() in ['yes', 'true', 'x'] or val.lower() in name_low
+                    val = "Yes" if is_checked else "Off"
+                if w.field_value != val:
+                    w.field_value = val
+                    dirty_widgets[id(w)] = w
+                filled_count += 1
+                unmatched_keys.discard(key)
+                matched_fields_info[key] = w.field_name
+        for w in dirty_widgets.values():
+            w.update()
+        telemetry["match_fill_ms"] = _elapsed_ms(step_start_phase)
 
-        step_start = datetime.now()
-        doc.save(
-            str(final_output_path), 
-            appearance=CONFIG["appearance"], 
-            incremental=False, 
-            deflate=CONFIG["deflate"]
-        )
+        step_start = time.perf_counter_ns()
+        if dirty_widgets:
+            doc.save(
+                str(final_output_path), 
+                appearance=CONFIG["appearance"], 
+                incremental=False, 
+                deflate=CONFIG["deflate"]
+            )
+        else:
+            # No value changed: copy the source instead of a full save with appearance regeneration
+            shutil.copyfile(input_path, final_output_path)
         doc.close()
-        telemetry["save_ms"] = round((datetime.now() - step_start).total_seconds() * 1000, 2)
-        telemetry["total_ms"] = round((datetime.now() - total_start).total_seconds() * 1000, 2)
+        telemetry["save_ms"] = _elapsed_ms(step_start)
+        telemetry["total_ms"] = _elapsed_ms(total_start)
         
         file_size = final_output_path.stat().st_size
-        file_id = hashlib.md5(f"{output_filename}:{total_start.isoformat()}".encode()).hexdigest()[:12]
+        file_id = hashlib.md5(f"{output_filename}:{started_at}".encode()).hexdigest()[:12]
         _file_sync.register_file(file_id, final_output_path, file_size)
         _protector.save(request_key, str(final_output_path.absolute()), file_id)
         
@@ -272,6 +340,7 @@ async def download_filled_form_logic(
     ignore_size_limit: bool = False
 ) -> Dict[str, Any]:
     """Refined logic for downloading a filled form."""
+    import fitz  # PyMuPDF
     try:
         if delete_after_read is None:
             delete_after_read = IS_CLOUD
@@ -321,9 +390,7 @@ async def download_filled_form_logic(
                 "instructions": f"Use resource 'berlin://forms/{safe_filename}'"
             }
 
-        with open(file_path, "rb") as f:
-            file_bytes = f.read()
-            encoded = base64.b64encode(file_bytes).decode('utf-8')
+        encoded = None if only_preview else encode_file_base64(file_path)
             
         if delete_after_read:
             file_path.unlink()
@@ -349,6 +416,7 @@ async def download_filled_form_logic(
 
 async def get_form_visual_preview_logic(filename: str, page_num: int = 0) -> Dict[str, Any]:
     """Renders PDF page to a HIGHLY COMPRESSED JPEG for safe chat preview."""
+    import fitz  # PyMuPDF
     try:
         safe_filename = Path(filename).name
         file_path = FILLED_FORMS_DIR / safe_filename
@@ -1,35 +1,80 @@
-import json
+import os
+import orjson
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
+ENTRY_TTL_SECONDS = 86400
+# Don't bother compacting logs shorter than this
+COMPACT_MIN_LINES = 64
+
 class LoopProtector:
-    """Persistent memory to stop tool-re-execution loops in remote environments."""
+    """Persistent memory to stop tool-re-execution loops in remote environments.
+    
+    Entries are kept in memory and persisted as an append-only JSON-lines log,
+    one {key: [timestamp, path, file_id]} object per line; later lines win.
+    """
     def __init__(self, file_path: Path):
         self.file_path = file_path
+        self._log_lines = 0
+        self._needs_compact = False
         self.hashes = self._load()
         
+    def _is_fresh(self, timestamp: str, now: datetime) -> bool:
+        return (now - datetime.fromisoformat(timestamp)).total_seconds() < ENTRY_TTL_SECONDS
+        
     def _load(self) -> Dict[str, Tuple[str, str, str]]:
         if not self.file_path.exists():
             return {}
+        entries: Dict[str, Tuple[str, str, str]] = {}
         try:
-            with open(self.file_path, "r") as f:
-                data = json.load(f)
-                # Cleanup old entries (> 24h)
-                now = datetime.now()
-                return {k: v for k, v in data.items() if (now - datetime.fromisoformat(v[0])).total_seconds() < 86400}
+            with open(self.file_path, "rb") as f:
+                for line in f:
+                    try:
+                        entries.update(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        # e.g. a line torn by a crash mid-append; rewrite the log on next save
+                        self._needs_compact = True
+                        continue
+                    self._log_lines += 1
+            # Cleanup old entries (> 24h)
+            now = datetime.now()
+            return {k: v for k, v in entries.items() if self._is_fresh(v[0], now)}
         except:
             return {}
             
     def save(self, key: str, path: str, file_id: str):
-        self.hashes[key] = (datetime.now().isoformat(), path, file_id)
+        """Record a completed request, appending it to the log right away so a killed process loses nothing.
+        
+        The log is compacted once it is mostly stale.
+        """
+        entry = (datetime.now().isoformat(), path, file_id)
+        self.hashes[key] = entry
         try:
-            with open(self.file_path, "w") as f:
-                json.dump(self.hashes, f)
+            with open(self.file_path, "ab") as f:
+                f.write(orjson.dumps({key: entry}) + b"\n")
+            self._log_lines += 1
+            if self._needs_compact or self._log_lines > 2 * max(len(self.hashes), COMPACT_MIN_LINES):
+                self._compact()
         except:
             pass
 
+    def _compact(self):
+        """Rewrite the log with one line per live entry."""
+        now = datetime.now()
+        self.hashes = {k: v for k, v in self.hashes.items() if self._is_fresh(v[0], now)}
+        tmp_path = self.file_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.writelines(orjson.dumps({k: v}) + b"\n" for k, v in self.hashes.items())
+        os.replace(tmp_path, self.file_path)
+        self._log_lines = len(self.hashes)
+        self._needs_compact = False
+
     def check(self, key: str) -> Optional[Tuple[str, str]]:
-        if key in self.hashes:
-            return self.hashes[key][1], self.hashes[key][2]
-        return None
+        entry = self.hashes.get(key)
+        if entry is None:
+            return None
+        if not self._is_fresh(entry[0], datetime.now()):
+            del self.hashes[key]
+            return None
+        return entry[1], entry[2]
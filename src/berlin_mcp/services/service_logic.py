@@ -1,14 +1,53 @@
-from typing import Dict
-from ..models import ServiceCategory, CATEGORY_KEYWORDS
+import functools
+import re
+from enum import Enum
+from typing import Dict, FrozenSet, List, Optional
+from ..models import ServiceCategory, FormType, CATEGORY_KEYWORDS, FORM_TYPE_KEYWORDS
+
+def _keyword_pattern(keywords_by_kind: Dict[Enum, FrozenSet[str]]) -> re.Pattern:
+    """One lookahead alternation over every keyword, grouped by kind in priority order.
+    
+    The lookahead reports a hit at every start position, so overlapping keywords are not skipped.
+    """
+    return re.compile(
+        "(?=" + "|".join(
+            f"(?P<{kind.name}>{'|'.join(map(re.escape, sorted(keywords)))})"
+            for kind, keywords in keywords_by_kind.items()
+        ) + ")"
+    )
+
+def _first_kind(pattern: re.Pattern, order: List[Enum], rank: Dict[str, int], text: str) -> Optional[Enum]:
+    """Highest-priority kind with a keyword in `text`, or None"""
+    best = None
+    for match in pattern.finditer(text):
+        hit = rank[match.lastgroup]
+        if best is None or hit < best:
+            best = hit
+            if best == 0:
+                break
+    return order[best] if best is not None else None
+
+_CATEGORY_ORDER = list(CATEGORY_KEYWORDS)
+_CATEGORY_RANK = {category.name: rank for rank, category in enumerate(_CATEGORY_ORDER)}
+CATEGORY_PATTERN = _keyword_pattern(CATEGORY_KEYWORDS)
+
+_FORM_TYPE_ORDER = list(FORM_TYPE_KEYWORDS)
+_FORM_TYPE_RANK = {form_type.name: rank for rank, form_type in enumerate(_FORM_TYPE_ORDER)}
+FORM_TYPE_PATTERN = _keyword_pattern(FORM_TYPE_KEYWORDS)
 
 def categorize_service(service: Dict) -> ServiceCategory:
     """Categorize a service based on its content"""
-    name = service.get("name", "").lower()
-    keywords = service.get("meta", {}).get("keywords", "").lower()
-    full_text = f"{name} {keywords}".lower()
-    
-    for category, keywords_list in CATEGORY_KEYWORDS.items():
-        if any(kw in full_text for kw in keywords_list):
-            return category
+    full_text = service.get("_full_lc")
+    if full_text is None:
+        name = (service.get("name") or "").lower()
+        keywords = ((service.get("meta") or {}).get("keywords") or "").lower()
+        full_text = f"{name} {keywords}"
     
-    return ServiceCategory.OTHER
+    category = _first_kind(CATEGORY_PATTERN, _CATEGORY_ORDER, _CATEGORY_RANK, full_text)
+    return category or ServiceCategory.OTHER
+
+@functools.lru_cache(maxsize=4096)
+def detect_form_type(form_name: str) -> FormType:
+    """Detect form type from name"""
+    form_type = _first_kind(FORM_TYPE_PATTERN, _FORM_TYPE_ORDER, _FORM_TYPE_RANK, form_name.lower())
+    return form_type or FormType.UNKNOWN
@@ -1,22 +1,45 @@
+import asyncio
 import json
-import subprocess
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 from .server import mcp
 from .config import logger, FILLED_FORMS_DIR, IS_CLOUD, HAS_OPEN_CMD
 from .models import ServiceCategory, FormType
 from .utils import expand_query
-from .services.api_client import fetch_services_data, get_cache_instance
-from .services.service_logic import categorize_service
+from .services.api_client import fetch_services_data, get_cache_instance, get_catalog_instance, get_service_by_id
 from .services.form_logic import (
     analyze_form_for_filling_logic, 
     perform_form_filling_logic, 
     download_filled_form_logic, 
-    get_form_visual_preview_logic,
-    detect_form_type
+    get_form_visual_preview_logic
 )
 import mcp.types as types
 
+def _public(item: Dict) -> Dict:
+    """Copy of a catalog entry without the derived "_" fields added at load time."""
+    return {k: v for k, v in item.items() if not k.startswith("_")}
+
+def _paginate(page: int, page_size: int) -> Tuple[int, int]:
+    """Slice bounds for a 1-based page, with page_size clamped to 1..50."""
+    page_size = max(1, min(page_size, 50))
+    start = (max(1, page) - 1) * page_size
+    return start, start + page_size
+
+def _search_result(s: Dict) -> Dict[str, Any]:
+    """Summary of a service as listed in search results."""
+    g = s.get
+    return {
+        "id": g("id"),
+        "name": g("name"),
+        "description": (g("description") or "")[:150],
+        "url": (g("meta") or {}).get("url"),
+        "category": s["_category_value"],
+        "has_online": bool(g("onlineservices")),
+        "fees": g("fees", "Not specified"),
+        "forms_count": s["_forms_count"],
+        "has_prerequisites": bool(g("prerequisites"))
+    }
+
 @mcp.tool()
 async def search_services(
     query: str,
@@ -35,42 +58,27 @@ async def search_services(
         if not query or len(query) < 2:
             return {"success": False, "error": "Query must be at least 2 characters"}
         
-        data, source = await fetch_services_data()
-        services = data.get("data", [])
+        _, source = await fetch_services_data()
         
+        cat = None
         if category:
             try:
                 cat = ServiceCategory[category.upper()]
-                services = [s for s in services if categorize_service(s) == cat]
             except KeyError:
                 pass
         
-        if online_only:
-            services = [s for s in services if s.get("onlineservices") or s.get("onlineprocessing")]
-        
-        if has_forms is not None:
-            if has_forms:
-                services = [s for s in services if s.get("forms")]
-            else:
-                services = [s for s in services if not s.get("forms")]
+        catalog = get_catalog_instance()
+        candidates = catalog.filter_positions(cat, online_only, has_forms)
         
         search_terms = expand_query(query)
-        matches = []
-        for s in services:
-            fields = [s.get("name", "").lower(), s.get("description", "").lower(), s.get("meta", {}).get("keywords", "").lower()]
-            if all(any(term in field for field in fields) for term in search_terms):
-                matches.append(s)
+        matches = catalog.search_positions(search_terms, within=candidates)
         
         if not matches and len(search_terms) > 1:
-            for s in services:
-                fields = [s.get("name", "").lower(), s.get("description", "").lower(), s.get("meta", {}).get("keywords", "").lower()]
-                if any(any(term in field for field in fields) for term in search_terms):
-                    matches.append(s)
+            matches = catalog.search_positions(search_terms, match_all=False, within=candidates)
                     
         total = len(matches)
-        start = (page - 1) * page_size
-        end = start + page_size
-        page_items = matches[start:end]
+        start, end = _paginate(page, page_size)
+        page_items = catalog.page_at(matches, start, end)
         
         return {
             "success": True,
@@ -81,20 +89,7 @@ async def search_services(
             "has_next": end < total,
             "has_previous": page > 1,
             "data_source": source,
-            "results": [
-                {
-                    "id": s.get("id"),
-                    "name": s.get("name"),
-                    "description": s.get("description", "")[:150],
-                    "url": s.get("meta", {}).get("url"),
-                    "category": categorize_service(s).value,
-                    "has_online": bool(s.get("onlineservices")),
-                    "fees": s.get("fees", "Not specified"),
-                    "forms_count": len(s.get("forms", [])),
-                    "has_prerequisites": bool(s.get("prerequisites"))
-                }
-                for s in page_items
-            ]
+            "results": [_search_result(s) for s in page_items]
         }
     except Exception as e:
         logger.error(f"Search error: {e}")
@@ -104,37 +99,36 @@ async def search_services(
 async def get_service_details(service_id: str) -> Dict[str, Any]:
     """Get complete details about a service including forms and prerequisites."""
     try:
-        data, source = await fetch_services_data()
-        services = data.get("data", [])
-        for service in services:
-            if service.get("id") == service_id:
-                return {
-                    "success": True,
-                    "data_source": source,
-                    "service": {
-                        "id": service.get("id"),
-                        "name": service.get("name"),
-                        "description": service.get("description"),
-                        "category": categorize_service(service).value,
-                        "url": service.get("meta", {}).get("url"),
-                        "keywords": service.get("meta", {}).get("keywords"),
-                        "last_updated": service.get("meta", {}).get("lastupdate"),
-                        "requirements": service.get("requirements", []),
-                        "prerequisites": service.get("prerequisites", []),
-                        "fees": service.get("fees"),
-                        "process_time": service.get("process_time"),
-                        "forms": service.get("forms", []),
-                        "forms_count": len(service.get("forms", [])),
-                        "responsibility": service.get("responsibility"),
-                        "online_processing": bool(service.get("onlineprocessing")),
-                        "online_services": service.get("onlineservices", []),
-                        "locations_count": len(service.get("locations", [])),
-                        "authorities": service.get("authorities", []),
-                        "links": service.get("links", []),
-                        "legal_basis": service.get("legal", [])
-                    }
-                }
-        return {"success": False, "error": f"Service {service_id} not found"}
+        _, source = await fetch_services_data()
+        service = get_service_by_id(service_id)
+        if not service:
+            return {"success": False, "error": f"Service {service_id} not found"}
+        return {
+            "success": True,
+            "data_source": source,
+            "service": {
+                "id": service.get("id"),
+                "name": service.get("name"),
+                "description": service.get("description"),
+                "category": service["_category_value"],
+                "url": (service.get("meta") or {}).get("url"),
+                "keywords": (service.get("meta") or {}).get("keywords"),
+                "last_updated": (service.get("meta") or {}).get("lastupdate"),
+                "requirements": service.get("requirements", []),
+                "prerequisites": service.get("prerequisites", []),
+                "fees": service.get("fees"),
+                "process_time": service.get("process_time"),
+                "forms": [_public(f) for f in service.get("forms", [])],
+                "forms_count": service["_forms_count"],
+                "responsibility": service.get("responsibility"),
+                "online_processing": bool(service.get("onlineprocessing")),
+                "online_services": service.get("onlineservices", []),
+                "locations_count": len(service.get("locations", [])),
+                "authorities": service.get("authorities", []),
+                "links": service.get("links", []),
+                "legal_basis": service.get("legal", [])
+            }
+        }
     except Exception as e:
         logger.error(f"Get details error: {e}")
         return {"success": False, "error": str(e)}
@@ -143,24 +137,23 @@ async def get_service_details(service_id: str) -> Dict[str, Any]:
 async def get_service_forms(service_id: str, include_metadata: bool = True) -> Dict[str, Any]:
     """Get all forms associated with a service with detailed metadata."""
     try:
-        data, source = await fetch_services_data()
-        services = data.get("data", [])
-        for service in services:
-            if service.get("id") == service_id:
-                forms = service.get("forms", [])
-                if not forms:
-                    return {"success": True, "service_id": service_id, "service_name": service.get("name"), "message": "No forms available", "forms": []}
-                processed_forms = []
-                for idx, form in enumerate(forms, 1):
-                    form_data = {"position": idx, "name": form.get("name"), "download_link": form.get("link"), "has_description": bool(form.get("description")), "description": form.get("description")}
-                    if include_metadata:
-                        form_data["detected_type"] = detect_form_type(form.get("name", "")).value
-                        form_data["is_pdf"] = form.get("link", "").lower().endswith(".pdf")
-                        if form.get("link"):
-                            form_data["filename"] = form.get("link").split("/")[-1].split("?")[0]
-                    processed_forms.append(form_data)
-                return {"success": True, "service_id": service_id, "service_name": service.get("name"), "data_source": source, "total_forms": len(processed_forms), "forms": processed_forms}
-        return {"success": False, "error": f"Service {service_id} not found"}
+        _, source = await fetch_services_data()
+        service = get_service_by_id(service_id)
+        if not service:
+            return {"success": False, "error": f"Service {service_id} not found"}
+        forms = service.get("forms", [])
+        if not forms:
+            return {"success": True, "service_id": service_id, "service_name": service.get("name"), "message": "No forms available", "forms": []}
+        processed_forms = []
+        for idx, form in enumerate(forms, 1):
+            form_data = {"position": idx, "name": form.get("name"), "download_link": form.get("link"), "has_description": bool(form.get("description")), "description": form.get("description")}
+            if include_metadata:
+                form_data["detected_type"] = form["_type_value"]
+                form_data["is_pdf"] = form.get("link", "").lower().endswith(".pdf")
+                if form.get("link"):
+                    form_data["filename"] = form.get("link").split("/")[-1].split("?")[0]
+            processed_forms.append(form_data)
+        return {"success": True, "service_id": service_id, "service_name": service.get("name"), "data_source": source, "total_forms": len(processed_forms), "forms": processed_forms}
     except Exception as e:
         logger.error(f"Get forms error: {e}")
         return {"success": False, "error": str(e)}
@@ -169,24 +162,18 @@ async def get_service_forms(service_id: str, include_metadata: bool = True) -> D
 async def search_forms(query: str, form_type: Optional[str] = None, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
     """Search for forms across all services."""
     try:
-        data, source = await fetch_services_data()
-        services = data.get("data", [])
+        _, source = await fetch_services_data()
         search_terms = expand_query(query)
-        results = []
-        for service in services:
-            for form in service.get("forms", []):
-                form_name = form.get("name", "").lower()
-                if all(term in form_name for term in search_terms):
-                    if form_type:
-                        try:
-                            if detect_form_type(form_name) != FormType[form_type.upper()]: continue
-                        except KeyError: pass
-                    results.append({"form_name": form.get("name"), "download_link": form.get("link"), "form_type": detect_form_type(form.get("name")).value, "service_id": service.get("id"), "service_name": service.get("name")})
-        
-        total = len(results)
-        start = (max(1, page) - 1) * max(1, min(page_size, 50))
-        end = start + max(1, min(page_size, 50))
-        return {"success": True, "query": query, "page": page, "page_size": page_size, "total_results": total, "has_next": end < total, "data_source": source, "results": results[start:end]}
+        target_type = None
+        if form_type:
+            try:
+                target_type = FormType[form_type.upper()]
+            except KeyError: pass
+        matches = get_catalog_instance().search_forms(search_terms, target_type)
+        total = len(matches)
+        start, end = _paginate(page, page_size)
+        results = [{"form_name": form.get("name"), "download_link": form.get("link"), "form_type": form["_type_value"], "service_id": service.get("id"), "service_name": service.get("name")} for service, form in matches[start:end]]
+        return {"success": True, "query": query, "page": page, "page_size": page_size, "total_results": total, "has_next": end < total, "data_source": source, "results": results}
     except Exception as e:
         logger.error(f"Search forms error: {e}")
         return {"success": False, "error": str(e)}
@@ -196,16 +183,12 @@ async def get_forms_by_type(form_type: str, page: int = 1, page_size: int = 20)
     """Get all forms of a specific type across services."""
     try:
         target_type = FormType[form_type.upper()]
-        data, source = await fetch_services_data()
-        results = []
-        for service in data.get("data", []):
-            for form in service.get("forms", []):
-                if detect_form_type(form.get("name", "")) == target_type:
-                    results.append({"form_name": form.get("name"), "download_link": form.get("link"), "service_id": service.get("id"), "service_name": service.get("name")})
-        total = len(results)
-        start = (max(1, page) - 1) * max(1, min(page_size, 50))
-        end = start + max(1, min(page_size, 50))
-        return {"success": True, "form_type": target_type.value, "page": page, "page_size": page_size, "total_results": total, "has_next": end < total, "results": results[start:end]}
+        await fetch_services_data()
+        matches = get_catalog_instance().forms_of_type(target_type)
+        total = len(matches)
+        start, end = _paginate(page, page_size)
+        results = [{"form_name": form.get("name"), "download_link": form.get("link"), "service_id": service.get("id"), "service_name": service.get("name")} for service, form in matches[start:end]]
+        return {"success": True, "form_type": target_type.value, "page": page, "page_size": page_size, "total_results": total, "has_next": end < total, "results": results}
     except KeyError:
         return {"success": False, "error": f"Invalid form type. Choose from: {', '.join([t.name for t in FormType])}"}
     except Exception as e:
@@ -216,11 +199,11 @@ async def get_forms_by_type(form_type: str, page: int = 1, page_size: int = 20)
 async def get_service_prerequisites(service_id: str) -> Dict[str, Any]:
     """Get all prerequisites and requirements for a service."""
     try:
-        data, _ = await fetch_services_data()
-        for s in data.get("data", []):
-            if s.get("id") == service_id:
-                return {"success": True, "service_id": service_id, "service_name": s.get("name"), "prerequisites": [{"name": p.get("name"), "description": p.get("description"), "link": p.get("link")} for p in s.get("prerequisites", [])], "requirements": s.get("requirements", []), "total_prerequisites": len(s.get("prerequisites", [])), "total_requirements": len(s.get("requirements", []))}
-        return {"success": False, "error": f"Service {service_id} not found"}
+        await fetch_services_data()
+        s = get_service_by_id(service_id)
+        if not s:
+            return {"success": False, "error": f"Service {service_id} not found"}
+        return {"success": True, "service_id": service_id, "service_name": s.get("name"), "prerequisites": [{"name": p.get("name"), "description": p.get("description"), "link": p.get("link")} for p in s.get("prerequisites", [])], "requirements": s.get("requirements", []), "total_prerequisites": len(s.get("prerequisites", [])), "total_requirements": len(s.get("requirements", []))}
     except Exception as e:
         logger.error(f"Get prerequisites error: {e}")
         return {"success": False, "error": str(e)}
@@ -229,14 +212,14 @@ async def get_service_prerequisites(service_id: str) -> Dict[str, Any]:
 async def get_service_checklist(service_id: str) -> Dict[str, Any]:
     """Get a comprehensive checklist for completing a service application."""
     try:
-        data, _ = await fetch_services_data()
-        for s in data.get("data", []):
-            if s.get("id") == service_id:
-                forms_by_type = {}
-                for f in s.get("forms", []):
-                    ft = detect_form_type(f.get("name", "")); forms_by_type.setdefault(ft.value, []).append({"name": f.get("name"), "link": f.get("link")})
-                return {"success": True, "service_id": service_id, "service_name": s.get("name"), "checklist": {"fees": s.get("fees", "Not specified"), "process_time": s.get("process_time"), "prerequisites": s.get("prerequisites", []), "requirements": s.get("requirements", []), "forms_to_complete": forms_by_type, "online_available": bool(s.get("onlineprocessing"))}}
-        return {"success": False, "error": f"Service {service_id} not found"}
+        await fetch_services_data()
+        s = get_service_by_id(service_id)
+        if not s:
+            return {"success": False, "error": f"Service {service_id} not found"}
+        forms_by_type = {}
+        for f in s.get("forms", []):
+            forms_by_type.setdefault(f["_type_value"], []).append({"name": f.get("name"), "link": f.get("link")})
+        return {"success": True, "service_id": service_id, "service_name": s.get("name"), "checklist": {"fees": s.get("fees", "Not specified"), "process_time": s.get("process_time"), "prerequisites": s.get("prerequisites", []), "requirements": s.get("requirements", []), "forms_to_complete": forms_by_type, "online_available": bool(s.get("onlineprocessing"))}}
     except Exception as e:
         logger.error(f"Get checklist error: {e}")
         return {"success": False, "error": str(e)}
@@ -279,7 +262,8 @@ async def open_file_locally(file_path: str) -> Dict[str, Any]:
     try:
         path = Path(file_path)
         if not path.exists(): return {"success": False, "error": "File not found."}
-        subprocess.run(["open", str(path.absolute())])
+        proc = await asyncio.create_subprocess_exec("open", str(path.absolute()))
+        await proc.wait()
         return {"success": True, "message": "Opened successfully."}
     except Exception as e: return {"success": False, "error": str(e)}
 
@@ -297,12 +281,11 @@ async def browse_services_by_category(category: str, page: int = 1, page_size: i
     """Browse services by category."""
     try:
         cat = ServiceCategory[category.upper()]
-        data, source = await fetch_services_data()
-        matches = [s for s in data.get("data", []) if categorize_service(s) == cat]
-        total = len(matches)
-        start = (max(1, page) - 1) * max(1, min(page_size, 50))
-        end = start + max(1, min(page_size, 50))
-        return {"success": True, "category": cat.value, "page": page, "results": [{"id": s.get("id"), "name": s.get("name")} for s in matches[start:end]]}
+        _, source = await fetch_services_data()
+        catalog = get_catalog_instance()
+        start, end = _paginate(page, page_size)
+        positions = catalog.page_positions(catalog.filter_positions(category=cat), start, end)
+        return {"success": True, "category": cat.value, "page": page, "results": catalog.listing(positions)}
     except KeyError: return {"success": False, "error": "Invalid category."}
     except Exception as e: return {"success": False, "error": str(e)}
 
@@ -310,22 +293,21 @@ async def browse_services_by_category(category: str, page: int = 1, page_size: i
 async def find_online_services(page: int = 1, page_size: int = 20) -> Dict[str, Any]:
     """Find all services available online."""
     try:
-        data, _ = await fetch_services_data()
-        online = [s for s in data.get("data", []) if s.get("onlineservices") or s.get("onlineprocessing")]
-        total = len(online)
-        start = (max(1, page) - 1) * max(1, min(page_size, 50))
-        return {"success": True, "results": [{"id": s.get("id"), "name": s.get("name")} for s in online[start:start+max(1, min(page_size, 50))]]}
+        await fetch_services_data()
+        catalog = get_catalog_instance()
+        start, end = _paginate(page, page_size)
+        positions = catalog.page_positions(catalog.filter_positions(online_only=True), start, end)
+        return {"success": True, "results": catalog.listing(positions)}
     except Exception as e: return {"success": False, "error": str(e)}
 
 @mcp.tool()
 async def get_service_locations(service_id: str) -> Dict[str, Any]:
     """Get all locations for a service."""
     try:
-        data, _ = await fetch_services_data()
-        for s in data.get("data", []):
-            if s.get("id") == service_id:
-                return {"success": True, "locations": [{"id": l.get("location"), "appointments": l.get("appointment", {}).get("allowed")} for l in s.get("locations", [])]}
-        return {"success": False, "error": "Not found."}
+        await fetch_services_data()
+        s = get_service_by_id(service_id)
+        if not s: return {"success": False, "error": "Not found."}
+        return {"success": True, "locations": [{"id": l.get("location"), "appointments": l.get("appointment", {}).get("allowed")} for l in s.get("locations", [])]}
     except Exception as e: return {"success": False, "error": str(e)}
 
 @mcp.tool()
@@ -334,7 +316,7 @@ async def get_api_status() -> Dict[str, Any]:
     try:
         data, source = await fetch_services_data()
         services = data.get("data", [])
-        return {"success": True, "data_source": source, "total_services": len(services)}
+        return {"success": True, "data_source": source, "total_services": len(services), "cache_version": get_cache_instance().version}
     except Exception as e: return {"success": False, "error": str(e)}
 
 @mcp.tool()
@@ -342,5 +324,6 @@ async def clear_cache() -> Dict[str, Any]:
     """Clear the service cache."""
     try:
         get_cache_instance().clear()
+        get_catalog_instance().clear()
         return {"success": True, "message": "Cache cleared."}
     except Exception as e: return {"success": False, "error": str(e)}
@@ -1,31 +1,57 @@
+import base64
+import io
+import re
+from pathlib import Path
 from typing import List
 
+# Multiple of 3 so each chunk encodes without padding and the pieces concatenate cleanly
+_B64_CHUNK_SIZE = 48 * 1024
+
+SYNONYMS = {
+    "deregister": "abmeldung",
+    "un-register": "abmeldung",
+    "register": "anmeldung",
+    "registration": "anmeldung",
+    "housing": "wohnung",
+    "apartment": "wohnung",
+    "birth": "geburt",
+    "death": "sterbefall",
+    "marriage": "ehe",
+    "identity": "ausweis",
+    "passport": "pass",
+    "business": "gewerbe",
+    "vehicle": "kfz",
+    "car": "kfz",
+    "driver": "fahrer",
+    "license": "erlaubnis",
+    "parking": "parken",
+    "resident": "bewohner"
+}
+
+# Longest-first lookahead alternation: one scan reports the longest synonym starting at each
+# position; shorter synonyms starting there are its prefixes and are added from _SYNONYM_PREFIXES.
+_SYNONYM_PATTERN = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(SYNONYMS, key=len, reverse=True))) + "))"
+)
+_SYNONYM_PREFIXES = {key: {other for other in SYNONYMS if key.startswith(other)} for key in SYNONYMS}
+
 def expand_query(query: str) -> List[str]:
     """Helper to expand query with synonyms and split into terms."""
     query_lower = query.lower()
-    synonyms = {
-        "deregister": "abmeldung",
-        "un-register": "abmeldung",
-        "register": "anmeldung",
-        "registration": "anmeldung",
-        "housing": "wohnung",
-        "apartment": "wohnung",
-        "birth": "geburt",
-        "death": "sterbefall",
-        "marriage": "ehe",
-        "identity": "ausweis",
-        "passport": "pass",
-        "business": "gewerbe",
-        "vehicle": "kfz",
-        "car": "kfz",
-        "driver": "fahrer",
-        "license": "erlaubnis",
-        "parking": "parken",
-        "resident": "bewohner"
-    }
+    found = set()
+    for match in _SYNONYM_PATTERN.finditer(query_lower):
+        found |= _SYNONYM_PREFIXES[match.group(1)]
     
     expanded = query_lower
-    for eng, ger in synonyms.items():
-        if eng in query_lower:
+    for eng, ger in SYNONYMS.items():
+        if eng in found:
             expanded += f" {ger}"
     return expanded.split()
+
+def encode_file_base64(path: Path) -> str:
+    """Base64-encode a file chunk by chunk instead of loading it whole."""
+    buf = io.BytesIO()
+    with open(path, "rb") as f:
+        while chunk := f.read(_B64_CHUNK_SIZE):
+            buf.write(base64.b64encode(chunk))
+    return buf.getvalue().decode("ascii")